@@ -3,8 +3,11 @@ import random
 import json
 import csv
 from abc import abstractmethod, ABC
-from dataclasses import dataclass
-from typing import Self
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Generic, TypeVar
 
 
 class Colour(enum.Enum):
@@ -34,85 +37,75 @@ class CreatureType(enum.Enum):
         return self.value
 
 
-class Playability(enum.Enum):
-    UNPLAYABLE = "Unplayable"
-    WEAK = "Weak"
-    MEDIUM = "Medium"
-    STRONG = "Strong"
+class Playability(enum.IntEnum):
+    UNPLAYABLE = 0
+    WEAK = 1
+    MEDIUM = 2
+    STRONG = 3
 
     def __str__(self):
-        return self.value
+        return self.name.title()
+
+
+def to_mask(members: Iterable[Colour] | Iterable[CreatureType]) -> int:
+    # one bit per enum member, in declaration order
+    mask = 0
+    for member in members:
+        mask |= 1 << list(type(member)).index(member)
+    return mask
+
+
+def rate_pair(
+    shared_colours: bool, linked_types: bool, mono_colour: bool
+) -> Playability:
+    if shared_colours:
+        if linked_types:
+            # e.g. WU Birds and W Lifecreed; GW Rabbits and RW Mice
+            return Playability.STRONG
+        elif mono_colour:
+            # e.g., U Lightshell and U Skyskipper
+            return Playability.MEDIUM
+        else:
+            # e.g. GR Raccoons and R Kindlespark or U Lightshell and U Skyskipper
+            return Playability.WEAK
+    elif linked_types:
+        if mono_colour:
+            # e.g., R Roughshod and G Treeguard (Mouse and Rabbit are synergistic through W Brave-Kin)
+            return Playability.MEDIUM
+        else:
+            # e.g., UG Frogs and W Lifecreed (Frog and Bird are synergistic through U Skyskipper)
+            return Playability.WEAK
+    elif mono_colour:
+        # e.g., B Daggerfang and G Treeguard (Rat and Squirrel have no synergistic links to Frog and Rabbit)
+        return Playability.WEAK
+    else:
+        # three-colour deck with no synergistic links is just flat-out unplayable
+        return Playability.UNPLAYABLE
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(frozen=True, slots=True)
 class Pack:
     name: str
-    colours: set[Colour]
-    creature_types: set[CreatureType]
+    colours: frozenset[Colour]
+    creature_types: frozenset[CreatureType]
+    # colours in the order packs.json lists them, e.g. GW Rabbits but WU Birds
+    colour_order: tuple[Colour, ...] = field(repr=False, compare=False)
+    colour_mask: int = field(init=False, repr=False, compare=False)
+    type_mask: int = field(init=False, repr=False, compare=False)
+    at_most_one_colour: bool = field(init=False, repr=False, compare=False)
+    _str: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "colour_mask", to_mask(self.colours))
+        object.__setattr__(self, "type_mask", to_mask(self.creature_types))
+        object.__setattr__(
+            self, "at_most_one_colour", self.colour_mask.bit_count() <= 1
+        )
+        colours = "".join(str(colour) for colour in self.colour_order)
+        object.__setattr__(self, "_str", f"{colours} {self.name}")
 
     def __str__(self):
-        return f"{''.join(self.colours)} {self.name}"
-
-    def matching_types(self, pack_two: Self) -> set[CreatureType]:
-        return {
-            creature_type
-            for creature_type in self.creature_types
-            if creature_type in pack_two.creature_types
-        }
-
-    def synergistic_types(
-        self, pack_two: Self, synergistic_type_pairs: set[frozenset[CreatureType]]
-    ) -> set[frozenset[CreatureType]]:
-        matches_with_pack_two = {
-            type_pair
-            for type_pair in synergistic_type_pairs
-            if any(
-                creature_type in type_pair for creature_type in pack_two.creature_types
-            )
-        }
-        matches_with_both_packs = {
-            type_pair
-            for type_pair in matches_with_pack_two
-            if any(creature_type in type_pair for creature_type in self.creature_types)
-        }
-        return matches_with_both_packs
-
-    def matching_colours(self, pack_two: Self) -> set[Colour]:
-        return {colour for colour in self.colours if colour in pack_two.colours}
-
-    def pair_playability(
-        self, pack_two: Self, synergistic_type_pairs: set[frozenset[CreatureType]]
-    ) -> Playability:
-        if self.matching_colours(pack_two):
-            if self.matching_types(pack_two) or self.synergistic_types(
-                pack_two, synergistic_type_pairs
-            ):
-                # e.g. WU Birds and W Lifecreed; GW Rabbits and RW Mice
-                return Playability.STRONG
-            else:
-                if max(len(self.colours), len(pack_two.colours)) == 1:
-                    # e.g., U Lightshell and U Skyskipper
-                    return Playability.MEDIUM
-                else:
-                    # e.g. GR Raccoons and R Kindlespark or U Lightshell and U Skyskipper
-                    return Playability.WEAK
-        else:
-            if self.matching_types(pack_two) or self.synergistic_types(
-                pack_two, synergistic_type_pairs
-            ):
-                if max(len(self.colours), len(pack_two.colours)) == 1:
-                    # e.g., R Roughshod and G Treeguard (Mouse and Rabbit are synergistic through W Brave-Kin)
-                    return Playability.MEDIUM
-                else:
-                    # e.g., UG Frogs and W Lifecreed (Frog and Bird are synergistic through U Skyskipper)
-                    return Playability.WEAK
-            else:
-                if max(len(self.colours), len(pack_two.colours)) == 1:
-                    # e.g., B Daggerfang and G Treeguard (Rat and Squirrel have no synergistic links to Frog and Rabbit)
-                    return Playability.WEAK
-                else:
-                    # three-colour deck with no synergistic links is just flat-out unplayable
-                    return Playability.UNPLAYABLE
+        return self._str
 
     def creature_type(self) -> CreatureType:
         if len(self.creature_types) == 1:
@@ -130,68 +123,132 @@ class Pack:
 def get_packs() -> list[Pack]:
     with open("input/packs.json") as file:
         pack_dicts = json.load(file)
-    return [Pack(**pack_data) for pack_data in pack_dicts]
+    packs: list[Pack] = []
+    for pack_data in pack_dicts:
+        colours = tuple(Colour(colour) for colour in pack_data["colours"])
+        packs.append(
+            Pack(
+                name=pack_data["name"],
+                colours=frozenset(colours),
+                creature_types=frozenset(
+                    CreatureType(creature_type)
+                    for creature_type in pack_data["creature_types"]
+                ),
+                colour_order=colours,
+            )
+        )
+    return packs
+
+
+def find_synergy_partners(
+    synergistic_type_pairs: set[int],
+) -> dict[CreatureType, int]:
+    synergy_partners: dict[CreatureType, int] = {}
+    for creature_type in CreatureType:
+        type_mask = to_mask([creature_type])
+        for type_pair in synergistic_type_pairs:
+            if type_pair & type_mask:
+                partners = synergy_partners.get(creature_type, 0)
+                synergy_partners[creature_type] = partners | (type_pair & ~type_mask)
+    return synergy_partners
+
+
+def synergy_partner_mask(creature_types: Iterable[CreatureType]) -> int:
+    partner_mask = 0
+    for creature_type in creature_types:
+        partner_mask |= SYNERGY_PARTNERS.get(creature_type, 0)
+    return partner_mask
 
 
 PACKS: list[Pack] = get_packs()
-STRONG_MATCHES: set[frozenset[str]] = set()
-MEDIUM_MATCHES: set[frozenset[str]] = set()
-WEAK_MATCHES: set[frozenset[str]] = set()
-UNPLAYABLE_MATCHES: set[frozenset[str]] = set()
-SYNERGISTIC_TYPE_PAIRS: set[frozenset[CreatureType]] = set()
+# PAIR_PLAYABILITY[i][j] is the Playability of PACKS[i] paired with PACKS[j]
+PAIR_PLAYABILITY: list[bytearray] = []
+# each synergistic pair of creature types as a two-bit type mask
+SYNERGISTIC_TYPE_PAIRS: set[int] = {
+    pack.type_mask
+    for pack in PACKS
+    if len(pack.creature_types) == 2 and len(pack.colours) == 1
+}
+# type mask of every creature type each creature type is synergistic with
+SYNERGY_PARTNERS: dict[CreatureType, int] = find_synergy_partners(
+    SYNERGISTIC_TYPE_PAIRS
+)
+RNG = random.Random()
+
+
+# integers only, so the O(N^2) loop never touches Pack objects
+def score_all_pairs(
+    colour_masks: list[int],
+    type_masks: list[int],
+    partner_masks: list[int],
+    at_most_one_colour: list[bool],
+) -> list[bytearray]:
+    pack_count = len(colour_masks)
+    pair_playability = [bytearray(pack_count) for _ in range(pack_count)]
+    for i in range(pack_count):
+        for j in range(i + 1, pack_count):
+            playability = rate_pair(
+                shared_colours=bool(colour_masks[i] & colour_masks[j]),
+                linked_types=bool(
+                    type_masks[i] & type_masks[j] or partner_masks[i] & type_masks[j]
+                ),
+                # max(len(colours_i), len(colours_j)) == 1
+                mono_colour=at_most_one_colour[i]
+                and at_most_one_colour[j]
+                and bool(colour_masks[i] | colour_masks[j]),
+            )
+            pair_playability[i][j] = playability
+            pair_playability[j][i] = playability
+    return pair_playability
 
 
 def initialize() -> None:
-    for pack in PACKS:
-        if len(pack.creature_types) == 2 and len(pack.colours) == 1:
-            SYNERGISTIC_TYPE_PAIRS.add(frozenset(pack.creature_types))
-    for number, pack_one in enumerate(PACKS, start=1):
-        if number > len(PACKS):
-            break
-        remaining_packs = PACKS[number:]
-        for pack_two in remaining_packs:
-            playability = pack_one.pair_playability(pack_two, SYNERGISTIC_TYPE_PAIRS)
-            if playability == Playability.STRONG:
-                STRONG_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
-            if playability == Playability.MEDIUM:
-                MEDIUM_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
-            if playability == Playability.WEAK:
-                WEAK_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
-            if playability == Playability.UNPLAYABLE:
-                UNPLAYABLE_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
+    PAIR_PLAYABILITY[:] = score_all_pairs(
+        [pack.colour_mask for pack in PACKS],
+        [pack.type_mask for pack in PACKS],
+        [synergy_partner_mask(pack.creature_types) for pack in PACKS],
+        [pack.at_most_one_colour for pack in PACKS],
+    )
+    score_draft.cache_clear()
+    score_picks.cache_clear()
+
+
+# both return the best Playability of any pair the draft allows, keyed on
+# sorted pack indices so every ordering of the same draft shares one entry
+@lru_cache(maxsize=None)
+def score_draft(drafted_packs: tuple[int, ...]) -> Playability:
+    return Playability(
+        max(
+            PAIR_PLAYABILITY[drafted_packs[i]][drafted_packs[j]]
+            for i in range(len(drafted_packs))
+            for j in range(i + 1, len(drafted_packs))
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def score_picks(first_pick: int, second_three: tuple[int, ...]) -> Playability:
+    return Playability(
+        max(PAIR_PLAYABILITY[first_pick][pack_two] for pack_two in second_three)
+    )
 
 
 def write_to_file() -> None:
-    packs = get_packs()
-    playability_matrix_fieldnames: list[str] = [""]
-    playability_matrix_rows: list[list[str]] = []
-    for pack in packs:
-        playability_matrix_fieldnames.append(str(pack))
-        if len(pack.creature_types) == 2 and len(pack.colours) == 1:
-            SYNERGISTIC_TYPE_PAIRS.add(frozenset(pack.creature_types))
-    for number, pack_one in enumerate(packs, start=1):
-        if number > len(packs):
-            break
-        playability_matrix_row: list[str] = [str(pack_one)] + [
-            "" for _ in range(number)
-        ]
-        remaining_packs = packs[number:]
-        for pack_two in remaining_packs:
-            playability = pack_one.pair_playability(pack_two, SYNERGISTIC_TYPE_PAIRS)
-            playability_matrix_row.append(playability.value)
-            if playability == Playability.STRONG:
-                STRONG_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
-            if playability == Playability.MEDIUM:
-                MEDIUM_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
-            if playability == Playability.WEAK:
-                WEAK_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
-            if playability == Playability.UNPLAYABLE:
-                UNPLAYABLE_MATCHES.add(frozenset({str(pack_one), str(pack_two)}))
-        playability_matrix_rows.append(playability_matrix_row)
+    if not PAIR_PLAYABILITY:
+        initialize()
+    playability_names = [str(playability) for playability in Playability]
+    pack_names = [str(pack) for pack in PACKS]
+    playability_matrix_fieldnames: list[str] = [""] + pack_names
     with open("output/playability_matrix.csv", "w") as playability_matrix_file:
         csv_writer = csv.writer(playability_matrix_file)
         csv_writer.writerow(playability_matrix_fieldnames)
-        csv_writer.writerows(playability_matrix_rows)
+        for i in range(len(PACKS)):
+            playability_matrix_row: list[str] = (
+                [pack_names[i]]
+                + ["" for _ in range(i + 1)]
+                + [playability_names[code] for code in PAIR_PLAYABILITY[i][i + 1 :]]
+            )
+            csv_writer.writerow(playability_matrix_row)
 
 
 @dataclass
@@ -202,121 +259,104 @@ class TotalResults:
     weak_or_better: int = 0
     unplayable_or_better: int = 0
 
-    def strong_or_better_chance(self):
-        return self.strong / self.total_runs
+    def __str__(self):
+        return (
+            f"{self.total_runs} runs: "
+            f"{self.strong_or_better_chance():.2%} strong or better, "
+            f"{self.medium_or_better_chance():.2%} medium or better, "
+            f"{self.weak_or_better_chance():.2%} weak or better, "
+            f"{self.unplayable_or_better_chance():.2%} unplayable or better"
+        )
 
-    def medium_or_better_chance(self):
-        return (self.strong + self.mediumn) / self.total_runs
+    def strong_or_better_chance(self) -> float:
+        if not self.total_runs:
+            return 0.0
+        return self.strong_or_better / self.total_runs
 
-    def weak_or_better_chance(self):
-        return (self.strong + self.medium + self.weak) / self.total_runs
+    def medium_or_better_chance(self) -> float:
+        if not self.total_runs:
+            return 0.0
+        return self.medium_or_better / self.total_runs
 
+    def weak_or_better_chance(self) -> float:
+        if not self.total_runs:
+            return 0.0
+        return self.weak_or_better / self.total_runs
+
+    def unplayable_or_better_chance(self) -> float:
+        if not self.total_runs:
+            return 0.0
+        return self.unplayable_or_better / self.total_runs
 
-@dataclass
-class DraftResult:
-    strong: int = 0
-    medium: int = 0
-    weak: int = 0
-    unplayable: int = 0
 
+# the shape of one draft, e.g. a hand of pack indices or a (pick, hand) pair
+Draft = TypeVar("Draft")
 
-class DraftStrategy(ABC):
+
+class DraftStrategy(ABC, Generic[Draft]):
     def __init__(self):
         self.results = TotalResults()
 
     @abstractmethod
-    def draft(self, packs: list[Pack]) -> list[Pack] | tuple[Pack, list[Pack]]:
+    def draft(self, packs: list[Pack]) -> Draft:
+        pass
+
+    @abstractmethod
+    def score(self, drafted_packs: Draft) -> Playability:
         pass
 
-    def get_draft_result(self, packs) -> DraftResult:
-        drafted_packs = self.draft(packs)
-        draft_result = DraftResult()
-        if type(drafted_packs) is tuple:
-            pack_one, remaining_packs = drafted_packs
-            for pack_two in remaining_packs:
-                pair = frozenset({str(pack_one), str(pack_two)})
-                if pair in STRONG_MATCHES:
-                    draft_result.strong += 1
-                elif pair in MEDIUM_MATCHES:
-                    draft_result.medium += 1
-                elif pair in WEAK_MATCHES:
-                    draft_result.weak += 1
-                elif pair in UNPLAYABLE_MATCHES:
-                    draft_result.unplayable += 1
-        elif type(drafted_packs) is list:
-            for number, pack_one in enumerate(drafted_packs, start=1):
-                if number == len(drafted_packs):
-                    break
-                remaining_packs = drafted_packs[number:]
-                for pack_two in remaining_packs:
-                    pair = frozenset({str(pack_one), str(pack_two)})
-                    if pair in STRONG_MATCHES:
-                        draft_result.strong += 1
-                    elif pair in MEDIUM_MATCHES:
-                        draft_result.medium += 1
-                    elif pair in WEAK_MATCHES:
-                        draft_result.weak += 1
-                    elif pair in UNPLAYABLE_MATCHES:
-                        draft_result.unplayable += 1
-        return draft_result
+    def get_draft_result(self, packs) -> Playability:
+        return self.score(self.draft(packs))
 
     def test(self, packs) -> TotalResults:
-        for _ in range(100000):
-            draft_result = self.get_draft_result(packs)
-            self.results.total_runs += 1
-            if draft_result.strong:
-                self.results.strong_or_better += 1
-            if draft_result.strong or draft_result.medium:
-                self.results.medium_or_better += 1
-            if draft_result.strong or draft_result.medium or draft_result.weak:
-                self.results.weak_or_better += 1
-            if (
-                draft_result.strong
-                or draft_result.medium
-                or draft_result.weak
-                or draft_result.unplayable
-            ):
-                self.results.unplayable_or_better += 1
+        if not PAIR_PLAYABILITY:
+            initialize()
+        draft_results = Counter(self.get_draft_result(packs) for _ in range(100000))
+        # runs per best Playability, so "X or better" is a suffix sum
+        runs = [draft_results[playability] for playability in Playability]
+        self.results.total_runs += sum(runs)
+        self.results.strong_or_better += sum(runs[Playability.STRONG :])
+        self.results.medium_or_better += sum(runs[Playability.MEDIUM :])
+        self.results.weak_or_better += sum(runs[Playability.WEAK :])
+        self.results.unplayable_or_better += sum(runs[Playability.UNPLAYABLE :])
         return self.results
 
 
-class DrawThreeStrategy(DraftStrategy):
-    def draft(self, packs: list[Pack]):
-        return random.sample(packs, 3)
-
-
-class DrawFourStrategy(DraftStrategy):
-    def draft(self, packs: list[Pack]):
-        return random.sample(packs, 4)
+class DrawKStrategy(DraftStrategy[tuple[int, ...]]):
+    def __init__(self, k: int):
+        if k < 2:
+            raise ValueError("DrawKStrategy needs at least two packs to form a pair")
+        super().__init__()
+        self.k = k
 
+    def draft(self, packs: list[Pack]) -> tuple[int, ...]:
+        return tuple(sorted(RNG.sample(range(len(packs)), self.k)))
 
-class DrawFiveStrategy(DraftStrategy):
-    def draft(self, packs: list[Pack]):
-        return random.sample(packs, 5)
+    def score(self, drafted_packs: tuple[int, ...]) -> Playability:
+        return score_draft(drafted_packs)
 
 
-class DrawSixStrategy(DraftStrategy):
-    def draft(self, packs: list[Pack]):
-        return random.sample(packs, 6)
-
-
-class DrawThreeTwiceStrategy(DraftStrategy):
+class DrawThreeTwiceStrategy(DraftStrategy[tuple[int, tuple[int, ...]]]):
     """
     Mathematically speaking this is roughly the same as DrawFour, but there's an opportunity for slightly improving a player's success by
     """
 
-    def draft(self, packs: list[Pack]) -> tuple[Pack, list[Pack]]:
-        first_three = random.sample(packs, 3)
-        rest = [pack for pack in packs if pack not in first_three]
-        first_pick = random.choice(first_three)
-        second_three = random.sample(rest, 3)
+    def draft(self, packs: list[Pack]) -> tuple[int, tuple[int, ...]]:
+        # the last three of one six-pack sample are disjoint from the first three
+        drafted_packs = RNG.sample(range(len(packs)), 6)
+        first_pick = drafted_packs[RNG.randrange(3)]
+        second_three = tuple(sorted(drafted_packs[3:]))
         return (first_pick, second_three)
 
+    def score(self, drafted_packs: tuple[int, tuple[int, ...]]) -> Playability:
+        first_pick, second_three = drafted_packs
+        return score_picks(first_pick, second_three)
+
 
 if __name__ == "__main__":
     initialize()
-    print(f"Draw Three results: {DrawThreeStrategy().test(PACKS)}")
-    print(f"Draw Four results: {DrawFourStrategy().test(PACKS)}")
-    print(f"Draw Five results: {DrawFiveStrategy().test(PACKS)}")
-    print(f"Draw Six results: {DrawSixStrategy().test(PACKS)}")
+    print(f"Draw Three results: {DrawKStrategy(3).test(PACKS)}")
+    print(f"Draw Four results: {DrawKStrategy(4).test(PACKS)}")
+    print(f"Draw Five results: {DrawKStrategy(5).test(PACKS)}")
+    print(f"Draw Six results: {DrawKStrategy(6).test(PACKS)}")
     print(f"Draw Three Twice results: {DrawThreeTwiceStrategy().test(PACKS)}")